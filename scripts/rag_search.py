@@ -4,11 +4,13 @@ This script implements a vector-based search against local documents using embed
 """
 
 import os
+import hashlib
 import json
-import pickle
 import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import Callable, List, Dict, Tuple
 import numpy as np
 from datetime import datetime
 
@@ -22,26 +24,200 @@ except ImportError:
     import requests
     import PyPDF2
 
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Optional: PyMuPDF extracts PDF text with the native MuPDF library, much
+# faster than pure-Python PyPDF2, which remains the fallback.
+try:
+    import pymupdf
+except ImportError:
+    pymupdf = None
+
+# Optional: FAISS provides SIMD kernels and an HNSW index for nearest-neighbour
+# search. Without it, search falls back to a brute-force NumPy scan.
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+# Optional: orjson parses the large numeric arrays in embedding responses
+# several times faster than the standard json module
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional: PyTorch runs the similarity scan on a CUDA GPU when one is present
+try:
+    import torch
+except ImportError:
+    torch = None
+
+# Optional: Numba JIT-compiles the brute-force cosine scan used when FAISS is
+# not installed. Without either, search uses a NumPy matrix-vector product.
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+
+if njit is not None:
+    @njit("void(f4[:, ::1], f4[::1], f4[::1])", parallel=True, fastmath=True, cache=True)
+    def _cosine_scores(emb_matrix, q_norm, out):
+        """Write the inner product of every (pre-normalized) row with the normalized query to out"""
+        n, dim = emb_matrix.shape
+        # Indexing is unchecked inside the loop, so mismatched shapes would
+        # read and write out of bounds
+        if q_norm.shape[0] != dim or out.shape[0] != n:
+            raise ValueError("_cosine_scores: query or output length does not match the matrix")
+        for i in prange(n):
+            s = np.float32(0.0)
+            for j in range(dim):
+                s += emb_matrix[i, j] * q_norm[j]
+            out[i] = s
+else:
+    _cosine_scores = None
+
+
+def _json_loads(data):
+    """Parse JSON from str or bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj, indent: bool = False) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None).encode("utf-8")
+
+
+def _l2_normalize(x: np.ndarray) -> np.ndarray:
+    """
+    Scale a vector (or each row of a matrix) to unit length, in place
+    
+    Stored rows are normalized once when they are embedded and the query once
+    per search, so cosine similarity reduces to a plain inner product.
+    
+    Args:
+        x: float32 vector or matrix (one vector per row)
+        
+    Returns:
+        The same array, normalized
+    """
+    x /= np.linalg.norm(x, axis=-1, keepdims=True) + 1e-10
+    return x
+
+
+def _content_hash(text: str) -> str:
+    """Stable key for a chunk's content, used to reuse cached embeddings"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first
+    
+    Uses a partial sort (O(N + k log k)) rather than sorting every score.
+    
+    Args:
+        scores: One similarity score per stored chunk
+        k: Number of indices to return (1 <= k <= len(scores))
+        
+    Returns:
+        Row indices ordered by descending score
+    """
+    if k < scores.size:
+        idx = np.argpartition(scores, scores.size - k)[-k:]
+    else:
+        idx = np.arange(scores.size)
+    return idx[np.argsort(scores[idx])[::-1]]
+
+
+def _write_atomically(path: str, write: Callable[[str], None]):
+    """
+    Write a file through a temporary sibling and rename it into place, so a
+    crash never leaves a half-written cache and readers (including existing
+    memory maps of the old file) are unaffected
+    
+    Args:
+        path: Destination file path
+        write: Function that writes the file contents to the path it is given
+    """
+    dest = Path(path)
+    tmp = dest.with_name(f"{dest.stem}.tmp{dest.suffix}")
+    write(str(tmp))
+    os.replace(tmp, dest)
+
 
 class RAGSearchEngine:
     """
     Retrieval-Augmented Generation Search Engine using Ollama
     """
     
-    def __init__(self, ollama_url: str = "http://localhost:11434", model: str = "gemma"):
+    def __init__(self, ollama_url: str = "http://localhost:11434", model: str = "gemma",
+                 quantize_int8: bool = False):
         """
         Initialize the RAG search engine
         
         Args:
             ollama_url: URL where Ollama is running
             model: Model name to use (default: gemma)
+            quantize_int8: If True, search a FAISS int8 scalar-quantized index
+                (a quarter of the float32 memory traffic, slightly lower precision);
+                requires FAISS
         """
         self.ollama_url = ollama_url
         self.model = model
+        if quantize_int8 and faiss is None:
+            print("[!] int8 quantization requires FAISS; searching float32 embeddings")
+            quantize_int8 = False
+        self.quantize_int8 = quantize_int8
+        self.use_gpu = (
+            torch is not None and torch.cuda.is_available() and not quantize_int8
+        )
         self.documents = []
-        self.embeddings = []
-        self.embeddings_cache = "embeddings/embeddings_cache.pkl"
+        
+        # Chunks are stored column-wise: row i of every column (and of
+        # emb_matrix) describes the same chunk
+        self.sources = []
+        self.contents = []
+        self.start_idx = np.empty(0, dtype=np.int32)
+        self.types = []
+        self.hashes = []
+        self.emb_matrix = None
+        self.hash_to_row = {}
+        self.index = None
+        self.emb_gpu = None
+        self._score_buf = None
+        
+        # Normalized query embeddings, most recently used last
+        self._query_cache = OrderedDict()
+        self.query_cache_size = 256
+        
+        self.embeddings_cache = "embeddings/embeddings.npy"
+        self.chunks_cache = "embeddings/chunks.json"
+        self.dim_cache = "embeddings/dim.txt"
         self.documents_cache = "embeddings/documents_cache.json"
+        self.faiss_index_cache = (
+            "embeddings/faiss_sq8.idx" if quantize_int8 else "embeddings/faiss.idx"
+        )
+        self.faiss_fingerprint_cache = f"{self.faiss_index_cache}.fingerprint"
+        
+        # All Ollama calls share pooled keep-alive connections. Failed
+        # connection attempts are retried briefly for every method; read
+        # timeouts are only retried for idempotent requests (the default),
+        # so a slow embedding batch is not resubmitted to Ollama
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=32,
+            max_retries=Retry(total=3, backoff_factor=0.1)
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
         
         # Create embeddings directory if it doesn't exist
         Path("embeddings").mkdir(exist_ok=True)
@@ -53,7 +229,7 @@ class RAGSearchEngine:
     def _check_ollama_connection(self):
         """Check if Ollama is running"""
         try:
-            response = requests.get(f"{self.ollama_url}/api/tags", timeout=5)
+            response = self.session.get(f"{self.ollama_url}/api/tags", timeout=5)
             if response.status_code == 200:
                 print("[✓] Connected to Ollama successfully")
                 # Check if gemma model is available
@@ -81,20 +257,35 @@ class RAGSearchEngine:
         Returns:
             Embedding vector as numpy array
         """
+        embeddings = self.get_embeddings_batch([text])
+        if embeddings is None:
+            return None
+        return embeddings[0]
+    
+    def get_embeddings_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Get embeddings for several texts in a single Ollama request
+        
+        Args:
+            texts: Texts to embed
+            
+        Returns:
+            Embedding matrix as numpy array, one row per text
+        """
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.ollama_url}/api/embed",
-                json={"model": self.model, "input": text},
+                json={"model": self.model, "input": texts},
                 timeout=30
             )
             if response.status_code == 200:
-                embedding = response.json()["embeddings"][0]
-                return np.array(embedding)
+                embeddings = _json_loads(response.content)["embeddings"]
+                return np.asarray(embeddings, dtype=np.float32)
             else:
-                print(f"[✗] Error getting embedding: {response.text}")
+                print(f"[✗] Error getting embeddings: {response.text}")
                 return None
         except Exception as e:
-            print(f"[✗] Error in get_embedding: {e}")
+            print(f"[✗] Error in get_embeddings_batch: {e}")
             return None
     
     def load_documents(self, doc_dir: str = "documents"):
@@ -129,24 +320,32 @@ class RAGSearchEngine:
         # Load PDF files
         for pdf_file in doc_path.glob("*.pdf"):
             try:
-                with open(pdf_file, "rb") as f:
-                    reader = PyPDF2.PdfReader(f)
-                    content = ""
-                    for page in reader.pages:
-                        content += page.extract_text() + "\n"
-                    self.documents.append({
-                        "source": pdf_file.name,
-                        "content": content,
-                        "type": "pdf"
-                    })
-                    print(f"[✓] Loaded: {pdf_file.name}")
+                content = self._extract_pdf_text(pdf_file)
+                self.documents.append({
+                    "source": pdf_file.name,
+                    "content": content,
+                    "type": "pdf"
+                })
+                print(f"[✓] Loaded: {pdf_file.name}")
             except Exception as e:
                 print(f"[✗] Error loading {pdf_file.name}: {e}")
         
         print(f"[INFO] Total documents loaded: {len(self.documents)}")
         self._save_documents_cache()
     
-    def chunk_documents(self, chunk_size: int = 500, overlap: int = 50) -> List[Dict]:
+    def _extract_pdf_text(self, pdf_file: Path) -> str:
+        """Extract the text of every page of a PDF file"""
+        if pymupdf is not None:
+            with pymupdf.open(pdf_file) as doc:
+                return "\n".join(page.get_text() for page in doc)
+        
+        with open(pdf_file, "rb") as f:
+            reader = PyPDF2.PdfReader(f)
+            # Collect pages and join once instead of repeated string concatenation
+            parts = [page.extract_text() or "" for page in reader.pages]
+            return "\n".join(parts)
+    
+    def chunk_documents(self, chunk_size: int = 500, overlap: int = 50) -> Dict[str, List]:
         """
         Split documents into chunks for better embedding
         
@@ -155,61 +354,251 @@ class RAGSearchEngine:
             overlap: Number of overlapping characters between chunks
             
         Returns:
-            List of chunks with metadata
+            Chunk columns: "source", "content", "type" (lists) and
+            "start_idx" (int32 array), one entry per chunk
         """
-        chunks = []
+        stride = chunk_size - overlap
+        if stride <= 0:
+            raise ValueError("overlap must be smaller than chunk_size")
+        
+        sources, contents, start_idx, types = [], [], [], []
         for doc in self.documents:
             content = doc["content"]
-            source = doc["source"]
             
-            # Split content into chunks
-            for i in range(0, len(content), chunk_size - overlap):
+            # Split content into chunks; isspace() tests for blank chunks
+            # without building a stripped copy of each one
+            for i in range(0, len(content), stride):
                 chunk = content[i:i + chunk_size]
-                if len(chunk.strip()) > 0:
-                    chunks.append({
-                        "source": source,
-                        "content": chunk,
-                        "start_idx": i,
-                        "type": doc["type"]
-                    })
+                if not chunk.isspace():
+                    sources.append(doc["source"])
+                    contents.append(chunk)
+                    start_idx.append(i)
+                    types.append(doc["type"])
         
-        print(f"[INFO] Created {len(chunks)} chunks from documents")
-        return chunks
+        print(f"[INFO] Created {len(contents)} chunks from documents")
+        return {
+            "source": sources,
+            "content": contents,
+            "start_idx": np.asarray(start_idx, dtype=np.int32),
+            "type": types
+        }
     
-    def create_embeddings(self, force_refresh: bool = False):
+    def create_embeddings(self, force_refresh: bool = False, batch_size: int = 64,
+                          max_workers: int = 8):
         """
         Create embeddings for all document chunks
         
+        Chunks whose content is already embedded (in memory or in the cache
+        files) are matched by content hash and reused; only new or changed
+        chunks are sent to Ollama.
+        
         Args:
-            force_refresh: If True, ignore cache and recreate embeddings
+            force_refresh: If True, ignore cache and recreate all embeddings
+            batch_size: Number of chunks sent to Ollama per request
+            max_workers: Number of embedding requests kept in flight at once
+                (use 1 if Ollama is configured to serve requests serially)
         """
-        # Check if embeddings are cached
-        if not force_refresh and self._load_embeddings_cache():
-            print("[✓] Loaded embeddings from cache")
-            return
-        
-        print(f"\n[INFO] Creating embeddings for documents...")
         chunks = self.chunk_documents()
         
-        if not chunks:
+        if not chunks["content"]:
             print("[!] No documents to embed")
             return
         
-        self.embeddings = []
-        total = len(chunks)
+        hashes = [_content_hash(content) for content in chunks["content"]]
         
-        for idx, chunk in enumerate(chunks):
-            print(f"[INFO] Processing chunk {idx + 1}/{total}...", end="\r")
-            embedding = self.get_embedding(chunk["content"])
-            if embedding is not None:
-                self.embeddings.append({
-                    "metadata": chunk,
-                    "embedding": embedding
-                })
+        # Check if embeddings are cached. Search structures for freshly loaded
+        # rows are only restored if those rows end up unchanged; otherwise
+        # they are built once, after the merge below
+        loaded = False
+        if force_refresh:
+            known = {}
+        elif self.emb_matrix is not None:
+            known = self.hash_to_row
+        elif self._load_embeddings_cache():
+            loaded = True
+            known = self.hash_to_row
+        else:
+            known = {}
+        
+        dim = self._embedding_dim(refresh=force_refresh)
+        if dim is None:
+            print("[✗] Could not determine the embedding dimension")
+            if loaded:
+                self._restore_index()
+            return
+        if known and self.emb_matrix.shape[1] != dim:
+            print("[!] Cached embeddings have a different dimension, re-embedding all chunks")
+            known = {}
+        
+        # Unique contents that still need an embedding, keyed by hash
+        pending = {}
+        for h, content in zip(hashes, chunks["content"]):
+            if h not in known and h not in pending:
+                pending[h] = content
+        
+        if not pending and hashes == self.hashes:
+            print("[✓] Embeddings are up to date")
+            if loaded:
+                self._restore_index()
+            return
+        
+        reused = sum(1 for h in hashes if h in known)
+        print(f"\n[INFO] Creating embeddings for {len(pending)} new chunks "
+              f"({reused} reused from cache)...")
+        new_hashes = list(pending)
+        texts = list(pending.values())
+        total = len(texts)
+        
+        # Batches are written straight into one preallocated block, in place
+        # of per-batch arrays that would later be stacked
+        new_matrix = np.empty((total, dim), dtype=np.float32)
+        embedded = np.zeros(total, dtype=bool)
+        width_changed = False
+        done = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.get_embeddings_batch, texts[start:start + batch_size]): start
+                for start in range(0, total, batch_size)
+            }
+            for future in as_completed(futures):
+                start = futures[future]
+                end = min(start + batch_size, total)
+                embeddings = future.result()
+                if embeddings is not None and embeddings.shape == (end - start, dim):
+                    new_matrix[start:end] = embeddings
+                    # Rows are L2-normalized once here so cosine similarity at
+                    # query time reduces to a single matrix-vector product
+                    _l2_normalize(new_matrix[start:end])
+                    embedded[start:end] = True
+                elif embeddings is not None:
+                    print(f"\n[✗] Unexpected embedding shape {embeddings.shape}, "
+                          f"expected {(end - start, dim)}")
+                    if embeddings.ndim == 2 and embeddings.shape[1] != dim:
+                        width_changed = True
+                done += end - start
+                print(f"[INFO] Processed {done}/{total} chunks...", end="\r")
+        
+        if width_changed:
+            # The model now returns a different embedding size (e.g. its tag
+            # was re-pulled): forget the remembered dimension and start over,
+            # which also discards cached rows of the old width
+            new_dim = self._embedding_dim(refresh=True)
+            if new_dim is not None and new_dim != dim:
+                print(f"\n[!] Embedding dimension changed from {dim} to {new_dim}, "
+                      f"re-embedding all chunks")
+                return self.create_embeddings(batch_size=batch_size, max_workers=max_workers)
         
-        print(f"\n[✓] Created {len(self.embeddings)} embeddings")
+        new_row = {h: i for i, h in enumerate(new_hashes) if embedded[i]}
+        
+        # Keep one row per current chunk, in chunk order, dropping rows of
+        # chunks that no longer exist and chunks that failed to embed
+        keep = [i for i, h in enumerate(hashes) if h in known or h in new_row]
+        kept_hashes = [hashes[i] for i in keep]
+        if keep:
+            # The final matrix is a single allocation: reused rows are gathered
+            # from the previous matrix and new rows from the new block
+            emb_matrix = np.empty((len(keep), dim), dtype=np.float32)
+            is_reused = np.fromiter((h in known for h in kept_hashes), dtype=bool, count=len(keep))
+            if is_reused.any():
+                emb_matrix[is_reused] = self.emb_matrix[[known[h] for h in kept_hashes if h in known]]
+            if not is_reused.all():
+                emb_matrix[~is_reused] = new_matrix[[new_row[h] for h in kept_hashes if h not in known]]
+            self.emb_matrix = emb_matrix
+        else:
+            self.emb_matrix = None
+        self.sources = [chunks["source"][i] for i in keep]
+        self.contents = [chunks["content"][i] for i in keep]
+        self.start_idx = chunks["start_idx"][keep]
+        self.types = [chunks["type"][i] for i in keep]
+        self.hashes = kept_hashes
+        self.hash_to_row = {h: i for i, h in enumerate(self.hashes)}
+        
+        print(f"\n[✓] Created {len(new_row)} embeddings ({len(self.contents)} total)")
+        self._build_index()
         self._save_embeddings_cache()
     
+    def _embedding_dim(self, refresh: bool = False) -> int:
+        """
+        Embedding dimension of the current model
+        
+        Probed with one embedding request the first time a model is used,
+        then remembered in embeddings/dim.txt.
+        
+        Args:
+            refresh: If True, ignore the remembered value and probe again
+            
+        Returns:
+            Dimension of the model's embeddings, or None if the probe failed
+        """
+        dims = {}
+        if Path(self.dim_cache).exists():
+            with open(self.dim_cache, "r", encoding="utf-8") as f:
+                for line in f:
+                    model, _, dim = line.rstrip("\n").rpartition("\t")
+                    if model:
+                        dims[model] = int(dim)
+        if self.model in dims and not refresh:
+            return dims[self.model]
+        
+        probe = self.get_embedding("dimension probe")
+        if probe is None:
+            return None
+        dims[self.model] = probe.size
+        
+        def write_dims(path):
+            with open(path, "w", encoding="utf-8") as f:
+                for model, dim in dims.items():
+                    f.write(f"{model}\t{dim}\n")
+        
+        _write_atomically(self.dim_cache, write_dims)
+        return probe.size
+    
+    def _chunk_metadata(self, row: int) -> Dict:
+        """Assemble the metadata dict of one stored chunk"""
+        return {
+            "source": self.sources[row],
+            "content": self.contents[row],
+            "start_idx": int(self.start_idx[row]),
+            "type": self.types[row]
+        }
+    
+    def _build_index(self):
+        """Build the search structures over the embedding matrix"""
+        self.index = None
+        self.emb_gpu = None
+        self._score_buf = None
+        if self.emb_matrix is None:
+            return
+        
+        if self.use_gpu:
+            # Exact scan on the GPU; the matrix is uploaded once as float16
+            self.emb_gpu = torch.from_numpy(np.ascontiguousarray(self.emb_matrix)).to(
+                "cuda", dtype=torch.float16
+            )
+            print(f"[✓] Uploaded {len(self.emb_gpu)} embeddings to the GPU")
+            return
+        
+        if faiss is None:
+            # Brute-force scans write their scores into this buffer instead
+            # of allocating a new array per query
+            self._score_buf = np.empty(len(self.emb_matrix), dtype=np.float32)
+            return
+        
+        # Rows are normalized, so inner product is cosine similarity
+        dim = self.emb_matrix.shape[1]
+        if self.quantize_int8:
+            self.index = faiss.IndexScalarQuantizer(
+                dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+            )
+            self.index.train(self.emb_matrix)
+            self.index.add(self.emb_matrix)
+            print(f"[✓] Built FAISS int8 index with {self.index.ntotal} vectors")
+        else:
+            self.index = faiss.IndexHNSWFlat(dim, 32, faiss.METRIC_INNER_PRODUCT)
+            self.index.hnsw.efConstruction = 200
+            self.index.add(self.emb_matrix)
+            print(f"[✓] Built FAISS HNSW index with {self.index.ntotal} vectors")
+    
     def search(self, query: str, top_k: int = 5) -> List[Dict]:
         """
         Search for documents relevant to the query
@@ -223,42 +612,91 @@ class RAGSearchEngine:
         """
         print(f"\n[INFO] Searching for: '{query}'")
         
-        if not self.embeddings:
+        if self.emb_matrix is None or not self.contents:
             print("[!] No embeddings available. Please create embeddings first.")
             return []
         
-        # Get query embedding
-        query_embedding = self.get_embedding(query)
-        if query_embedding is None:
+        # Get query embedding, reusing it if this exact query was seen recently
+        q = self._query_cache.get(query)
+        if q is not None:
+            self._query_cache.move_to_end(query)
+        else:
+            query_embedding = self.get_embedding(query)
+            if query_embedding is None:
+                return []
+            
+            # Only the query is normalized here; stored rows already are
+            q = _l2_normalize(query_embedding.astype(np.float32))
+            self._query_cache[query] = q
+            if len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+        
+        # The model may have been swapped for one with a different output size
+        # since the documents were embedded; no backend can score across widths
+        stored_dim = self.emb_matrix.shape[1]
+        if q.shape[0] != stored_dim:
+            self._query_cache.clear()
+            if q.shape[0] == self._embedding_dim(refresh=True):
+                print(f"[!] Embedding dimension changed ({stored_dim} -> {q.shape[0]}), "
+                      f"re-embedding documents")
+                self.create_embeddings()
+            if self.emb_matrix is None or q.shape[0] != self.emb_matrix.shape[1]:
+                print("[!] Query and document embeddings differ in size. "
+                      "Type 'refresh' to rebuild the embeddings.")
+                return []
+            self._query_cache[query] = q
+        
+        k = min(top_k, len(self.contents))
+        if k <= 0:
             return []
         
-        # Calculate similarity scores
-        similarities = []
-        for emb_data in self.embeddings:
-            doc_embedding = emb_data["embedding"]
-            # Cosine similarity
-            similarity = np.dot(query_embedding, doc_embedding) / (
-                np.linalg.norm(query_embedding) * np.linalg.norm(doc_embedding) + 1e-10
-            )
-            similarities.append({
-                "metadata": emb_data["metadata"],
-                "similarity": similarity
-            })
+        if self.emb_gpu is not None:
+            # Matrix-vector product and top-k selection both run on the GPU,
+            # so only k scores are copied back
+            q_gpu = torch.from_numpy(q).to("cuda", dtype=torch.float16)
+            top = torch.topk(self.emb_gpu @ q_gpu, k)
+            scores = top.values.float().cpu().numpy()
+            idx = top.indices.cpu().numpy()
+        elif self.index is not None:
+            # Nearest-neighbour search in FAISS
+            scores, idx = self.index.search(q.reshape(1, -1), k)
+            scores, idx = scores[0], idx[0]
+            # FAISS pads with -1 when fewer than k neighbours are found
+            found = idx >= 0
+            scores, idx = scores[found], idx[found]
+        else:
+            if _cosine_scores is not None:
+                # JIT-compiled parallel scan over the pre-normalized matrix
+                sims = self._score_buf
+                _cosine_scores(self.emb_matrix, q, sims)
+            else:
+                # Cosine similarity against the pre-normalized matrix in one BLAS call
+                sims = np.matmul(self.emb_matrix, q, out=self._score_buf)
+            
+            idx = _top_k(sims, k)
+            scores = sims[idx]
         
-        # Sort by similarity and get top-k
-        similarities.sort(key=lambda x: x["similarity"], reverse=True)
-        results = similarities[:top_k]
+        # Python objects are only built for the selected rows
+        results = [
+            {"metadata": self._chunk_metadata(i), "similarity": float(score)}
+            for i, score in zip(idx, scores)
+        ]
         
         print(f"[✓] Found {len(results)} relevant chunks")
         return results
     
-    def generate_response(self, query: str, search_results: List[Dict]) -> str:
+    def generate_response(self, query: str, search_results: List[Dict],
+                          echo: bool = False) -> str:
         """
         Generate a response using the search results and Gemma
         
+        The response is streamed from Ollama token by token, so there is no
+        overall timeout on long answers.
+        
         Args:
             query: Original query
             search_results: Search results from RAG
+            echo: If True, print tokens to stdout as they arrive
             
         Returns:
             Generated response from Gemma
@@ -285,16 +723,33 @@ Answer:"""
         print(f"\n[INFO] Generating response using Gemma...")
         
         try:
-            response = requests.post(
+            # Only connecting is time-limited; tokens may take as long as they need
+            with self.session.post(
                 f"{self.ollama_url}/api/generate",
-                json={"model": self.model, "prompt": prompt, "stream": False},
-                timeout=60
-            )
-            if response.status_code == 200:
-                return response.json()["response"]
-            else:
-                print(f"[✗] Error generating response: {response.text}")
-                return "Error generating response"
+                json={"model": self.model, "prompt": prompt, "stream": True},
+                stream=True,
+                timeout=(5, None)
+            ) as response:
+                if response.status_code != 200:
+                    print(f"[✗] Error generating response: {response.text}")
+                    return "Error generating response"
+                
+                parts = []
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = _json_loads(line)
+                    if "error" in chunk:
+                        print(f"[✗] Error generating response: {chunk['error']}")
+                        return "Error generating response"
+                    token = chunk.get("response", "")
+                    parts.append(token)
+                    if echo:
+                        sys.stdout.write(token)
+                        sys.stdout.flush()
+                    if chunk.get("done"):
+                        break
+                return "".join(parts)
         except Exception as e:
             print(f"[✗] Error in generate_response: {e}")
             return "Error generating response"
@@ -307,6 +762,7 @@ Answer:"""
         print("Commands:")
         print("  - Type your question to search")
         print("  - Type 'reload' to reload documents")
+        print("  - Type 'refresh' to re-embed all documents from scratch")
         print("  - Type 'quit' to exit")
         print("="*60 + "\n")
         
@@ -320,10 +776,16 @@ Answer:"""
                 
                 if query.lower() == "reload":
                     self.load_documents()
-                    self.create_embeddings(force_refresh=True)
+                    self.create_embeddings()
                     print("[✓] Documents reloaded")
                     continue
                 
+                if query.lower() == "refresh":
+                    self.load_documents()
+                    self.create_embeddings(force_refresh=True)
+                    print("[✓] Embeddings rebuilt")
+                    continue
+                
                 if not query:
                     print("[!] Please enter a valid query")
                     continue
@@ -340,13 +802,12 @@ Answer:"""
                     print(f"    Similarity: {result['similarity']:.2%}")
                     print(f"    Content: {result['metadata']['content'][:200]}...")
                 
-                # Generate response
-                response = self.generate_response(query, results)
+                # Generate response, printing tokens as they stream in
                 print("\n" + "-"*60)
                 print("GENERATED RESPONSE:")
                 print("-"*60)
-                print(response)
-                print("-"*60)
+                self.generate_response(query, results, echo=True)
+                print("\n" + "-"*60)
                 
             except KeyboardInterrupt:
                 print("\n[INFO] Search interrupted. Exiting...")
@@ -354,28 +815,92 @@ Answer:"""
             except Exception as e:
                 print(f"[✗] Error during search: {e}")
     
+    def _rows_fingerprint(self) -> str:
+        """Digest identifying the current rows (model and chunk contents, in order)"""
+        digest = hashlib.blake2b(self.model.encode("utf-8"), digest_size=16)
+        for h in self.hashes:
+            digest.update(h.encode("ascii"))
+        return digest.hexdigest()
+    
     def _save_embeddings_cache(self):
-        """Save embeddings to cache file"""
+        """Save the embedding matrix (.npy) and chunk columns (JSON) to cache files"""
+        if self.emb_matrix is None:
+            return
+        
+        def write_chunks(path):
+            with open(path, "wb") as f:
+                f.write(_json_dumps({
+                    "source": self.sources,
+                    "content": self.contents,
+                    "start_idx": self.start_idx.tolist(),
+                    "type": self.types,
+                    "hash": self.hashes
+                }))
+        
         try:
-            with open(self.embeddings_cache, "wb") as f:
-                pickle.dump(self.embeddings, f)
+            _write_atomically(self.embeddings_cache, lambda path: np.save(path, self.emb_matrix))
+            _write_atomically(self.chunks_cache, write_chunks)
+            if self.index is not None:
+                # The fingerprint is written last, so an interrupted save
+                # leaves an index that fails the check on load
+                _write_atomically(self.faiss_index_cache,
+                                  lambda path: faiss.write_index(self.index, path))
+                _write_atomically(self.faiss_fingerprint_cache,
+                                  lambda path: Path(path).write_text(self._rows_fingerprint()))
+            else:
+                # An index left over from an earlier run describes old rows
+                Path(self.faiss_index_cache).unlink(missing_ok=True)
+                Path(self.faiss_fingerprint_cache).unlink(missing_ok=True)
             print(f"[✓] Embeddings cached to {self.embeddings_cache}")
         except Exception as e:
             print(f"[!] Error saving embeddings cache: {e}")
     
     def _load_embeddings_cache(self) -> bool:
-        """Load embeddings from cache file"""
-        if not Path(self.embeddings_cache).exists():
+        """
+        Load embeddings from cache files
+        
+        Search structures are not set up here; call _restore_index() once the
+        loaded rows are final.
+        """
+        if not (Path(self.embeddings_cache).exists() and Path(self.chunks_cache).exists()):
             return False
         try:
-            with open(self.embeddings_cache, "rb") as f:
-                self.embeddings = pickle.load(f)
-            print(f"[✓] Loaded {len(self.embeddings)} embeddings from cache")
+            # Copy-on-write memory map: pages are read straight from the file
+            # on first touch, and the array stays writable for JIT kernels
+            emb_matrix = np.load(self.embeddings_cache, mmap_mode="c")
+            with open(self.chunks_cache, "rb") as f:
+                columns = _json_loads(f.read())
+            if len(columns["content"]) != len(emb_matrix):
+                print("[!] Embeddings cache is inconsistent, rebuilding")
+                return False
+            self.sources = columns["source"]
+            self.contents = columns["content"]
+            self.start_idx = np.asarray(columns["start_idx"], dtype=np.int32)
+            self.types = columns["type"]
+            self.hashes = columns["hash"]
+            self.emb_matrix = emb_matrix
+            self.hash_to_row = {h: i for i, h in enumerate(self.hashes)}
+            print(f"[✓] Loaded {len(self.contents)} embeddings from cache")
             return True
         except Exception as e:
             print(f"[!] Error loading embeddings cache: {e}")
             return False
     
+    def _restore_index(self):
+        """Reuse the persisted FAISS index if it was built from the current rows, else rebuild"""
+        if (faiss is not None and not self.use_gpu
+                and Path(self.faiss_index_cache).exists()
+                and Path(self.faiss_fingerprint_cache).exists()
+                and Path(self.faiss_fingerprint_cache).read_text() == self._rows_fingerprint()):
+            try:
+                index = faiss.read_index(self.faiss_index_cache)
+                if index.ntotal == len(self.contents):
+                    self.index = index
+                    return
+            except Exception as e:
+                print(f"[!] Error loading FAISS index: {e}")
+        self._build_index()
+    
     def _save_documents_cache(self):
         """Save documents to cache file"""
         try:
@@ -383,8 +908,8 @@ Answer:"""
                 {k: v for k, v in doc.items() if k != "content"}
                 for doc in self.documents
             ]
-            with open(self.documents_cache, "w") as f:
-                json.dump(docs_to_save, f, indent=2)
+            with open(self.documents_cache, "wb") as f:
+                f.write(_json_dumps(docs_to_save, indent=True))
         except Exception as e:
             print(f"[!] Error saving documents cache: {e}")
 
@@ -4,9 +4,15 @@ Assumes Weaviate is running on localhost:8090
 """
 
 import weaviate
-from weaviate.classes.config import Property, DataType
+from weaviate.classes.config import Configure, Property, DataType, VectorDistances
+from weaviate.classes.query import MetadataQuery
 import json
+import requests
 from datetime import datetime
+from typing import List, Optional
+
+OLLAMA_URL = "http://localhost:11434"
+EMBEDDING_MODEL = "gemma"
 
 def connect_to_weaviate(host: str = "localhost", port: int = 8090) -> weaviate.WeaviateClient:
     """
@@ -31,6 +37,32 @@ def connect_to_weaviate(host: str = "localhost", port: int = 8090) -> weaviate.W
         raise
 
 
+def get_embeddings(texts: List[str], ollama_url: str = OLLAMA_URL,
+                   model: str = EMBEDDING_MODEL) -> Optional[List[List[float]]]:
+    """
+    Embed texts with Ollama in a single request
+    
+    Args:
+        texts: Texts to embed
+        ollama_url: URL where Ollama is running
+        model: Embedding model name
+    
+    Returns:
+        One embedding vector per text, or None if Ollama is unavailable
+    """
+    try:
+        response = requests.post(
+            f"{ollama_url}/api/embed",
+            json={"model": model, "input": texts},
+            timeout=60
+        )
+        response.raise_for_status()
+        return response.json()["embeddings"]
+    except Exception as e:
+        print(f"Failed to get embeddings from Ollama: {e}")
+        return None
+
+
 def create_class_schema(client: weaviate.WeaviateClient) -> None:
     """
     Create a Document class schema in Weaviate
@@ -43,10 +75,15 @@ def create_class_schema(client: weaviate.WeaviateClient) -> None:
         except:
             pass
         
-        # Create new collection with properties
+        # Create new collection with properties. Vectors are supplied on
+        # insert (Ollama embeddings) and indexed with HNSW on cosine distance
         client.collections.create(
             name="Document",
             description="A document for RAG system",
+            vectorizer_config=Configure.Vectorizer.none(),
+            vector_index_config=Configure.VectorIndex.hnsw(
+                distance_metric=VectorDistances.COSINE
+            ),
             properties=[
                 Property(name="title", data_type=DataType.TEXT),
                 Property(name="content", data_type=DataType.TEXT),
@@ -107,12 +144,21 @@ def insert_records(client: weaviate.WeaviateClient) -> None:
     try:
         collection = client.collections.get("Document")
         
-        for i, doc in enumerate(sample_documents, 1):
-            try:
-                collection.data.insert(properties=doc)
-                print(f"✓ Inserted document {i}: {doc['title']}")
-            except Exception as e:
-                print(f"✗ Error inserting document {i}: {e}")
+        vectors = get_embeddings([doc["content"] for doc in sample_documents])
+        if vectors is None:
+            print("Inserting without vectors; semantic search will be unavailable")
+            vectors = [None] * len(sample_documents)
+        
+        # Objects are sent in batches rather than one request per document
+        with collection.batch.dynamic() as batch:
+            for doc, vector in zip(sample_documents, vectors):
+                batch.add_object(properties=doc, vector=vector)
+        
+        failed = collection.batch.failed_objects
+        for error in failed:
+            title = error.object_.properties.get("title", "N/A")
+            print(f"✗ Error inserting document '{title}': {error.message}")
+        print(f"✓ Inserted {len(sample_documents) - len(failed)} of {len(sample_documents)} documents")
     except Exception as e:
         print(f"Error accessing collection: {e}")
 
@@ -148,6 +194,39 @@ def retrieve_all_records(client: weaviate.WeaviateClient) -> None:
         print(f"Error retrieving documents: {e}")
 
 
+def semantic_search(client: weaviate.WeaviateClient, query_emb: List[float], k: int = 3) -> None:
+    """
+    Find the k documents nearest to a query embedding
+    
+    The k-NN search runs server-side on Weaviate's HNSW index, so only the
+    matching objects are transferred.
+    """
+    print("\n" + "="*60)
+    print(f"SEMANTIC SEARCH (top {k})")
+    print("="*60)
+    
+    try:
+        collection = client.collections.get("Document")
+        
+        response = collection.query.near_vector(
+            near_vector=list(query_emb),
+            limit=k,
+            return_metadata=MetadataQuery(distance=True)
+        )
+        
+        if not response or not response.objects:
+            print("No matching documents found")
+            return
+        
+        for obj in response.objects:
+            properties = obj.properties
+            print(f"  • {properties.get('title', 'N/A')} "
+                  f"({properties.get('source', 'N/A')}) - distance: {obj.metadata.distance:.4f}")
+            
+    except Exception as e:
+        print(f"Error in semantic search: {e}")
+
+
 def search_by_category(client: weaviate.WeaviateClient, category: str) -> None:
     """
     Search documents by category
@@ -203,6 +282,13 @@ def main():
         search_by_category(client, "AI/ML")
         search_by_category(client, "RAG")
         
+        # Semantic search
+        query = "How does retrieval-augmented generation work?"
+        query_vectors = get_embeddings([query])
+        if query_vectors is not None:
+            print(f"\nQuery: {query}")
+            semantic_search(client, query_vectors[0], k=3)
+        
         print("\n" + "="*60)
         print("Operations completed successfully!")
         print("="*60)